@@ -1,7 +1,6 @@
-# bot.py - главный файл Telegram-бота с веб-сервером
+# bot.py - главный файл Telegram-бота (веб-страницы - в web.py)
 import os
-import json
-import random
+import hmac
 import logging
 import threading
 import time
@@ -9,8 +8,10 @@ import requests
 import sys
 import socket
 import asyncio
-from datetime import datetime
-from flask import Flask, jsonify
+from flask import jsonify, request
+
+import tracing
+from state import UserState, load_user_data
 
 # ===== ПРОВЕРКА ПОРТА =====
 def is_port_in_use(port):
@@ -41,80 +42,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# --- СОЗДАЕМ FLASK ПРИЛОЖЕНИЕ ---
-app = Flask(__name__)
-
-# Загружаем данные
-try:
-    from examples import EXAMPLES
-    logger.info(f"✅ Загружено {len(EXAMPLES)} примеров")
-except ImportError as e:
-    logger.error(f"❌ Не удалось загрузить examples.py: {e}")
-    EXAMPLES = []
+# --- FLASK ПРИЛОЖЕНИЕ (страницы читают снимок статистики, см. web.py) ---
+from web import app
+from snapshot import publish, SNAPSHOT_INTERVAL
 
-USER_DATA_FILE = 'user_data.json'
+# Темы и примеры загружаются лениво, при первом обращении
+from topics import TOPICS, DEFAULT_TOPIC, get_topic, find_by_title, parse_answer
 
-def load_user_data():
-    try:
-        with open(USER_DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-def save_user_data(data):
-    with open(USER_DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def loaded_examples_count():
+    return sum(len(topic.examples) for topic in TOPICS.values() if topic.loaded)
 
 user_data = load_user_data()
-user_data_lock = threading.Lock()
+user_data_lock = tracing.TracedLock(threading.Lock())
+state = UserState(user_data, user_data_lock)
 
-# --- ВЕБ-ЭНДПОИНТЫ ---
-@app.route('/')
-def home():
-    with user_data_lock:
-        user_count = len(user_data)
-    
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>🤖 Бот для тренировки запятых</title>
-        <meta charset="utf-8">
-        <style>
-            body {{ font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }}
-            .status {{ color: green; font-weight: bold; }}
-        </style>
-    </head>
-    <body>
-        <h1>🤖 Бот для тренировки запятых перед "и"</h1>
-        <p>Статус: <span class="status">✅ Активен</span></p>
-        <p>Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        <p>Примеров в базе: {len(EXAMPLES)}</p>
-        <p>Пользователей: {user_count}</p>
-        <hr>
-        <p>🔄 Бот автоматически поддерживает активность каждые 5 минут</p>
-        <p>🌐 Веб-сервер запущен и слушает порт</p>
-        <p>🤖 Telegram бот работает в фоновом режиме</p>
-        <p><a href="/ping">Проверить связь</a> | <a href="/health">Статус</a></p>
-    </body>
-    </html>
-    """
+# FloodControlMiddleware бота (создаётся в run_telegram_bot), для снимка статистики
+flood_control = None
 
-@app.route('/ping')
-def ping():
-    logger.info("Получен ping запрос")
-    return 'pong', 200
+# --- ПРОФИЛИРОВАНИЕ (эндпоинт есть только в процессе бота) ---
+@app.route('/profile', methods=['POST'])
+def profile():
+    """Запускает профилирование event loop бота: POST /profile?seconds=30&token=..."""
+    token = request.args.get('token', '')
+    if not tracing.PROFILE_TOKEN or not hmac.compare_digest(token.encode(), tracing.PROFILE_TOKEN.encode()):
+        return jsonify({"error": "forbidden"}), 403
+    
+    seconds = max(1, min(request.args.get('seconds', 30, type=int), tracing.PROFILE_MAX_SECONDS))
+    try:
+        tracing.profiler.start_from_thread(seconds)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    
+    return jsonify({
+        "status": "started",
+        "seconds": seconds,
+        "directory": tracing.profiler.directory,
+        "last_profile": tracing.profiler.last_path
+    }), 202
 
-@app.route('/health')
-def health():
-    with user_data_lock:
-        return jsonify({
-            "status": "healthy",
-            "timestamp": datetime.now().isoformat(),
-            "users": len(user_data),
-            "examples": len(EXAMPLES),
-            "bot_status": "running"
-        }), 200
+# --- ПУБЛИКАЦИЯ СНИМКА СТАТИСТИКИ ---
+class StatsPublisher:
+    """Периодически пишет снимок статистики для веб-воркеров"""
+    def __init__(self, bot_thread):
+        self.active = True
+        self.bot_thread = bot_thread
+        
+    def publish(self):
+        try:
+            with user_data_lock:
+                users = len(user_data)
+                cache = user_data.stats()
+            publish({
+                "users": users,
+                "topics": len(TOPICS),
+                "loaded_topics": [key for key, topic in TOPICS.items() if topic.loaded],
+                "examples": loaded_examples_count(),
+                "user_cache": cache,
+                "flood_control": flood_control.stats() if flood_control else None,
+                "bot_running": self.bot_thread.is_alive()
+            })
+            return True
+        except Exception as e:
+            # Любая ошибка здесь иначе тихо убила бы поток, и веб навсегда показал бы stale
+            logger.warning(f"⚠️ Не удалось опубликовать снимок статистики: {e!r}")
+            return False
+    
+    def start(self):
+        def worker():
+            while self.active:
+                self.publish()
+                time.sleep(SNAPSHOT_INTERVAL)
+        
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
 
 # --- СИСТЕМА САМОПИНГА ---
 class SelfPinger:
@@ -156,7 +157,7 @@ def run_telegram_bot():
         from aiogram.enums import ParseMode
         from aiogram.client.default import DefaultBotProperties
         from config import API_TOKEN
-        from rules import RULE_TEXT
+        from throttling import FloodControlMiddleware
         
         # Инициализация бота
         bot = Bot(
@@ -164,6 +165,13 @@ def run_telegram_bot():
             default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
         )
         dp = Dispatcher()
+        tracing.setup_tracing(dp, bot)
+        global flood_control
+        flood_control = FloodControlMiddleware()
+        dp.message.outer_middleware(flood_control)
+        
+        # Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора
+        background_tasks = set()
         
         # Клавиатуры
         def get_main_keyboard():
@@ -172,17 +180,26 @@ def run_telegram_bot():
             builder.add(types.KeyboardButton(text="🚀 Начать тест"))
             builder.add(types.KeyboardButton(text="📊 Статистика"))
             builder.add(types.KeyboardButton(text="💪 Работа над ошибками"))
-            builder.adjust(2, 2)
+            builder.add(types.KeyboardButton(text="📚 Темы"))
+            builder.adjust(2, 2, 1)
             return builder.as_markup(resize_keyboard=True)
         
-        def get_test_keyboard():
+        def get_test_keyboard(topic):
             builder = ReplyKeyboardBuilder()
-            builder.add(types.KeyboardButton(text="✅ Да, нужна"))
-            builder.add(types.KeyboardButton(text="❌ Нет, не нужна"))
+            builder.add(types.KeyboardButton(text=topic.answers[0]))
+            builder.add(types.KeyboardButton(text=topic.answers[1]))
             builder.add(types.KeyboardButton(text="🔙 В меню"))
             builder.adjust(2, 1)
             return builder.as_markup(resize_keyboard=True)
         
+        def get_topics_keyboard():
+            builder = ReplyKeyboardBuilder()
+            for topic in TOPICS.values():
+                builder.add(types.KeyboardButton(text=topic.title))
+            builder.add(types.KeyboardButton(text="🔙 В меню"))
+            builder.adjust(1)
+            return builder.as_markup(resize_keyboard=True)
+        
         # Обработчики
         @dp.message(Command("start"))
         async def cmd_start(message: types.Message):
@@ -191,29 +208,19 @@ def run_telegram_bot():
             
             logger.info(f"Пользователь {user_name} (ID: {user_id}) запустил бота")
             
-            with user_data_lock:
-                if user_id not in user_data:
-                    user_data[user_id] = {
-                        "user_name": user_name,
-                        "total_tests": 0,
-                        "correct_answers": 0,
-                        "incorrect_answers": 0,
-                        "accuracy": 0.0,
-                        "last_active": datetime.now().isoformat(),
-                        "mistakes": []
-                    }
-                    save_user_data(user_data)
+            topic = state.ensure_user(user_id, user_name)
             
             welcome_text = f"""
 Привет, {user_name}! 👋
 
 *Я бот-тренажёр по русскому языку!*
 
-Я помогу тебе научиться правильно ставить запятую перед союзом *«И»*.
+Я помогу тебе научиться правильно ставить запятые.
+📚 Текущая тема: *{topic.title}* (всего тем: {len(TOPICS)})
 
 📊 *Что я умею:*
 • Объяснять правило с примерами
-• Проводить тесты (у нас {len(EXAMPLES)} примеров!)
+• Проводить тесты (в этой теме {len(topic.examples)} примеров!)
 • Показывать статистику
 • Помогать работать над ошибками
 
@@ -221,36 +228,91 @@ def run_telegram_bot():
 """
             await message.answer(welcome_text, reply_markup=get_main_keyboard())
         
+        @dp.message(Command("profile"))
+        async def cmd_profile(message: types.Message):
+            if not tracing.is_admin(message.from_user.id):
+                await message.answer("Я не понимаю эту команду. Используйте меню ниже:", reply_markup=get_main_keyboard())
+                return
+            
+            parts = message.text.split()
+            seconds = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 30
+            seconds = max(1, min(seconds, tracing.PROFILE_MAX_SECONDS))
+            
+            async def capture_and_report():
+                try:
+                    path = await tracing.profiler.capture(seconds)
+                except RuntimeError as e:
+                    await message.answer(f"❌ {e}")
+                    return
+                await message.answer(f"✅ Профиль сохранён: `{path}`")
+            
+            # Профилирование идёт в фоне: обработчик не держит слот и очередь админа
+            await message.answer(f"🧪 Профилирую event loop {seconds} сек...")
+            task = asyncio.create_task(capture_and_report())
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+        
+        @dp.message(lambda message: message.text == "📚 Темы")
+        async def show_topics(message: types.Message):
+            user_id = str(message.from_user.id)
+            
+            current = state.current_topic(user_id)
+            
+            text = "📚 *Выберите тему для тренировки:*\n"
+            if current:
+                text += f"\nСейчас: *{current.title}*"
+            await message.answer(text, reply_markup=get_topics_keyboard())
+        
+        @dp.message(lambda message: find_by_title(message.text) is not None)
+        async def select_topic(message: types.Message):
+            user_id = str(message.from_user.id)
+            topic = find_by_title(message.text)
+            
+            if not state.select_topic(user_id, topic.key):
+                await message.answer("Статистика не найдена. Нажмите /start")
+                return
+            
+            await message.answer(
+                f"✅ Тема: *{topic.title}*\nПримеров: {len(topic.examples)}. Начните с '📖 Правило' или сразу '🚀 Начать тест'.",
+                reply_markup=get_main_keyboard()
+            )
+        
         @dp.message(lambda message: message.text == "📖 Правило")
         async def show_rule(message: types.Message):
-            await message.answer(RULE_TEXT)
+            user_id = str(message.from_user.id)
+            
+            topic = state.current_topic(user_id) or get_topic(DEFAULT_TOPIC)
+            
+            await message.answer(topic.rule_text)
         
         @dp.message(lambda message: message.text == "📊 Статистика")
         async def show_stats(message: types.Message):
             user_id = str(message.from_user.id)
             
-            with user_data_lock:
-                if user_id in user_data:
-                    data = user_data[user_id]
-                    total = data["total_tests"]
-                    correct = data["correct_answers"]
-                    
-                    if total > 0:
-                        accuracy = (correct / total) * 100
-                        stats_text = f"""
+            user_stats = state.stats(user_id)
+            
+            if user_stats:
+                user_name, topic, progress = user_stats
+                total = progress["total_tests"]
+                correct = progress["correct_answers"]
+                
+                if total > 0:
+                    accuracy = (correct / total) * 100
+                    stats_text = f"""
 *📊 Ваша статистика*
 
-👤 Имя: {data['user_name']}
+👤 Имя: {user_name}
+📚 Тема: {topic.title}
 ✅ Правильных ответов: {correct}
-❌ Неправильных ответов: {data['incorrect_answers']}
+❌ Неправильных ответов: {progress['incorrect_answers']}
 📈 Всего тестов: {total}
 🎯 Точность: {accuracy:.1f}%
-🔄 Прогресс: {correct} из {len(EXAMPLES)} примеров освоено
+🔄 Прогресс: {correct} из {len(topic.examples)} примеров освоено
 """
-                    else:
-                        stats_text = "Вы ещё не прошли ни одного теста. Нажмите '🚀 Начать тест'!"
                 else:
-                    stats_text = "Статистика не найдена. Нажмите /start"
+                    stats_text = "Вы ещё не прошли ни одного теста. Нажмите '🚀 Начать тест'!"
+            else:
+                stats_text = "Статистика не найдена. Нажмите /start"
             
             await message.answer(stats_text)
         
@@ -258,26 +320,22 @@ def run_telegram_bot():
         async def show_mistakes(message: types.Message):
             user_id = str(message.from_user.id)
             
-            with user_data_lock:
-                if user_id not in user_data or not user_data[user_id]["mistakes"]:
-                    await message.answer("🎉 У вас пока нет ошибок! Продолжайте в том же духе!")
-                    return
-                
-                mistakes = user_data[user_id]["mistakes"].copy()
+            topic, mistakes = state.mistakes(user_id)
+            # Если примеры темы не загрузились, показывать нечего
+            mistakes = [example_idx for example_idx in mistakes if example_idx < len(topic.examples)]
+            
+            if not mistakes:
+                await message.answer("🎉 У вас пока нет ошибок! Продолжайте в том же духе!")
+                return
             
             recent_mistakes = mistakes[-10:] if len(mistakes) > 10 else mistakes
             
-            mistakes_text = "💪 *Работа над ошибками*\n\n"
+            mistakes_text = f"💪 *Работа над ошибками* ({topic.title})\n\n"
             mistakes_text += f"Всего ошибок: {len(mistakes)}\n\n"
             
             for i, example_idx in enumerate(recent_mistakes, 1):
-                example, correct_answer, explanation = EXAMPLES[example_idx]
-                
-                if correct_answer:
-                    parts = example.rsplit(" и ", 1)
-                    formatted_example = parts[0] + ", и " + parts[1] if len(parts) == 2 else example
-                else:
-                    formatted_example = example
+                explanation = topic.examples[example_idx][2]
+                formatted_example = topic.correct_sentence(example_idx)
                 
                 mistakes_text += f"{i}. `{formatted_example}`\n"
                 mistakes_text += f"   📝 *Объяснение:* {explanation}\n\n"
@@ -293,83 +351,62 @@ def run_telegram_bot():
         async def clear_mistakes(message: types.Message):
             user_id = str(message.from_user.id)
             
-            with user_data_lock:
-                if user_id in user_data:
-                    user_data[user_id]["mistakes"] = []
-                    save_user_data(user_data)
-                    await message.answer("✅ История ошибок очищена!", reply_markup=get_main_keyboard())
-                else:
-                    await message.answer("❌ Ошибка: данные пользователя не найдены", reply_markup=get_main_keyboard())
+            if state.clear_mistakes(user_id):
+                await message.answer("✅ История ошибок очищена!", reply_markup=get_main_keyboard())
+            else:
+                await message.answer("❌ Ошибка: данные пользователя не найдены", reply_markup=get_main_keyboard())
         
         @dp.message(lambda message: message.text == "🚀 Начать тест")
         async def start_test(message: types.Message):
             user_id = str(message.from_user.id)
             
-            with user_data_lock:
-                if user_id not in user_data:
-                    await cmd_start(message)
+            question = state.start_question(user_id)
+            if question is None:
+                topic = state.current_topic(user_id)
+                if topic is not None and not topic.examples:
+                    await message.answer(
+                        f"⚠️ В теме «{topic.title}» сейчас нет примеров. Выберите другую тему в '📚 Темы'.",
+                        reply_markup=get_main_keyboard()
+                    )
                     return
+                await cmd_start(message)
+                return
             
-            example_index = random.randint(0, len(EXAMPLES) - 1)
-            
-            with user_data_lock:
-                user_data[user_id]["current_example"] = example_index
-                save_user_data(user_data)
-            
-            example_text, correct_answer, explanation = EXAMPLES[example_index]
+            topic, example_index = question
             
             question_text = f"""
-*Пример {example_index + 1} из {len(EXAMPLES)}*
+*Пример {example_index + 1} из {len(topic.examples)}* ({topic.title})
 
-`{example_text}`
+`{topic.question_sentence(example_index)}`
 
-❓ *Вопрос:* Нужна ли запятой перед союзом *«и»* в этом предложении?
+❓ *Вопрос:* {topic.question}
 """
-            await message.answer(question_text, reply_markup=get_test_keyboard())
+            await message.answer(question_text, reply_markup=get_test_keyboard(topic))
         
-        @dp.message(lambda message: message.text in ["✅ Да, нужна", "❌ Нет, не нужна"])
-        async def check_answer(message: types.Message):
+        @dp.message(lambda message: parse_answer(message.text) is not None)
+        async def check_answer(message: types.Message, flood_idle):
             user_id = str(message.from_user.id)
             
-            with user_data_lock:
-                if user_id not in user_data or "current_example" not in user_data[user_id]:
-                    await message.answer("❌ Сначала начните тест, нажав '🚀 Начать тест'", reply_markup=get_main_keyboard())
-                    return
-                
-                example_index = user_data[user_id]["current_example"]
-                del user_data[user_id]["current_example"]
+            user_answer = parse_answer(message.text)
             
-            example_text, correct_answer, explanation = EXAMPLES[example_index]
-            user_answer = (message.text == "✅ Да, нужна")
+            result = state.answer(user_id, user_answer)
+            if result is None:
+                await message.answer("❌ Сначала начните тест, нажав '🚀 Начать тест'", reply_markup=get_main_keyboard())
+                return
             
-            with user_data_lock:
-                user_data[user_id]["total_tests"] += 1
-                is_correct = (user_answer == correct_answer)
-                
-                if is_correct:
-                    user_data[user_id]["correct_answers"] += 1
-                else:
-                    user_data[user_id]["incorrect_answers"] += 1
-                    if example_index not in user_data[user_id]["mistakes"]:
-                        user_data[user_id]["mistakes"].append(example_index)
-                
-                total = user_data[user_id]["total_tests"]
-                correct = user_data[user_id]["correct_answers"]
-                user_data[user_id]["accuracy"] = (correct / total * 100) if total > 0 else 0
-                user_data[user_id]["last_active"] = datetime.now().isoformat()
-                save_user_data(user_data)
-            
-            if correct_answer:
-                parts = example_text.rsplit(" и ", 1)
-                formatted_example = parts[0] + ", и " + parts[1] if len(parts) == 2 else example_text
-            else:
-                formatted_example = example_text
+            topic = result["topic"]
+            example_index = result["example_index"]
+            is_correct = result["is_correct"]
+            correct_answer = result["correct_answer"]
+            explanation = result["explanation"]
+            
+            formatted_example = topic.correct_sentence(example_index)
             
             result_text = f"""
 {'✅ *ПРАВИЛЬНО!*' if is_correct else '❌ *НЕПРАВИЛЬНО*'}
 
-*Ваш ответ:* {"✅ Да, нужна" if user_answer else "❌ Нет, не нужна"}
-*Правильный ответ:* {"✅ Да, нужна" if correct_answer else "❌ Нет, не нужна"}
+*Ваш ответ:* {topic.answer_label(user_answer)}
+*Правильный ответ:* {topic.answer_label(correct_answer)}
 
 *Правильный вариант:*
 `{formatted_example}`
@@ -377,12 +414,14 @@ def run_telegram_bot():
 *Объяснение:*
 {explanation}
 
-*Ваша статистика:*
-Правильно: {user_data[user_id]["correct_answers"]} из {user_data[user_id]["total_tests"]}
-Точность: {user_data[user_id]["accuracy"]:.1f}%
+*Ваша статистика ({topic.title}):*
+Правильно: {result["correct"]} из {result["total"]}
+Точность: {result["accuracy"]:.1f}%
 """
             await message.answer(result_text)
-            await asyncio.sleep(2)
+            # Пауза перед следующим сообщением не должна занимать общий слот
+            async with flood_idle():
+                await asyncio.sleep(2)
             
             builder = ReplyKeyboardBuilder()
             builder.add(types.KeyboardButton(text="➡️ Следующий вопрос"))
@@ -400,10 +439,7 @@ def run_telegram_bot():
         async def back_to_menu(message: types.Message):
             user_id = str(message.from_user.id)
             
-            with user_data_lock:
-                if user_id in user_data and "current_example" in user_data[user_id]:
-                    del user_data[user_id]["current_example"]
-                    save_user_data(user_data)
+            state.cancel_question(user_id)
             
             await message.answer("Возвращаемся в главное меню...", reply_markup=get_main_keyboard())
         
@@ -415,13 +451,13 @@ def run_telegram_bot():
         async def auto_save():
             while True:
                 await asyncio.sleep(300)
-                with user_data_lock:
-                    save_user_data(user_data)
-                    logger.info("Данные пользователей автосохранены")
+                state.flush()
+                logger.info("Данные пользователей автосохранены")
         
         # Основная функция бота
         async def main_bot():
             logger.info("🤖 Запуск Telegram бота...")
+            tracing.profiler.attach(asyncio.get_running_loop())
             
             # Запускаем автосохранение
             asyncio.create_task(auto_save())
@@ -455,7 +491,7 @@ def main():
     print("=" * 60)
     print("🚀 ЗАПУСК СИСТЕМЫ")
     print("=" * 60)
-    print(f"📝 Примеров в базе: {len(EXAMPLES)}")
+    print(f"📝 Тем: {len(TOPICS)} (примеры загружаются при первом обращении)")
     
     with user_data_lock:
         print(f"👥 Пользователей: {len(user_data)}")
@@ -473,7 +509,11 @@ def main():
     bot_thread.start()
     logger.info("✅ Telegram бот запущен в отдельном потоке")
     
-    # 3. Запускаем веб-сервер в основном потоке
+    # 3. Публикуем снимок статистики для веб-сервера
+    StatsPublisher(bot_thread).start()
+    logger.info("✅ Публикация статистики запущена")
+    
+    # 4. Запускаем веб-сервер в основном потоке
     logger.info("✅ Запуск веб-сервера...")
     run_web_server()
 
@@ -0,0 +1,29 @@
+# Файл: examples_introductory.py
+# Примеры для тренажёра по запятым при вводных словах
+# Предложения записаны с правильной пунктуацией - в вопросе убираются ВСЕ запятые,
+# поэтому в предложениях не должно быть запятых, не относящихся к теме
+
+EXAMPLES = [
+    # ========== ЗАПЯТЫЕ НУЖНЫ (True) ==========
+    ("Конечно, мы поможем тебе", True, "«Конечно» - вводное слово, выражает уверенность."),
+    ("Он, кажется, уже ушёл", True, "«Кажется» - вводное слово, выражает предположение."),
+    ("К счастью, дождь скоро закончился", True, "«К счастью» - вводное сочетание, выражает чувство."),
+    ("Во-первых, нужно выучить правило", True, "«Во-первых» - вводное слово, указывает порядок мыслей."),
+    ("Она, по-моему, права", True, "«По-моему» - вводное слово, указывает источник мнения."),
+    ("Наверное, завтра будет снег", True, "«Наверное» - вводное слово, выражает предположение."),
+    ("Поезд, к сожалению, опоздал", True, "«К сожалению» - вводное сочетание, выражает чувство."),
+    ("Словом, всё прошло отлично", True, "«Словом» - вводное слово, подводит итог."),
+    ("Безусловно, это лучший вариант", True, "«Безусловно» - вводное слово, выражает уверенность."),
+    ("Итак, начнём урок", True, "«Итак» - вводное слово, указывает порядок мыслей."),
+
+    # ========== ЗАПЯТЫЕ НЕ НУЖНЫ (False) ==========
+    ("Однако он не пришёл", False, "«Однако» в начале предложения в значении «но» - союз, а не вводное слово."),
+    ("Он вдруг замолчал", False, "«Вдруг» никогда не бывает вводным словом."),
+    ("Я едва успел на поезд", False, "«Едва» - наречие, не вводное слово."),
+    ("Он будто бы не слышал нас", False, "«Будто бы» - частица, не выделяется запятыми."),
+    ("Я всё-таки решил пойти", False, "«Всё-таки» - частица, не вводное слово."),
+    ("Мы почти закончили работу", False, "«Почти» - наречие, не вводное слово."),
+    ("Тебе верно сказали", False, "«Верно» здесь значит «правильно» и является обстоятельством."),
+    ("Зато мы успели на поезд", False, "«Зато» - союз, не вводное слово."),
+    ("Мне кажется странным его поведение", False, "«Кажется» здесь сказуемое, а не вводное слово."),
+]
@@ -0,0 +1,33 @@
+# Файл: examples_participial.py
+# Примеры для тренажёра по запятым при причастном обороте
+# Предложения записаны с правильной пунктуацией - в вопросе убираются ВСЕ запятые,
+# поэтому в предложениях не должно быть запятых, не относящихся к теме
+
+EXAMPLES = [
+    # ========== ЗАПЯТЫЕ НУЖНЫ (True) ==========
+    # Оборот после определяемого слова
+    ("Дорога, ведущая к дому, заросла травой", True, "Оборот «ведущая к дому» стоит после слова «дорога»."),
+    ("Письмо, полученное вчера, лежало на столе", True, "Оборот «полученное вчера» стоит после слова «письмо»."),
+    ("Мальчик, читающий книгу, не заметил нас", True, "Оборот «читающий книгу» стоит после слова «мальчик»."),
+    ("Листья, опавшие за ночь, покрыли дорожку", True, "Оборот «опавшие за ночь» стоит после слова «листья»."),
+    ("Мы подошли к реке, покрытой тонким льдом", True, "Оборот «покрытой тонким льдом» стоит после слова «реке» и заканчивает предложение."),
+    ("На берегу стоял дом, построенный ещё дедом", True, "Оборот «построенный ещё дедом» стоит после слова «дом»."),
+    ("Я нашёл книгу, забытую кем-то на скамейке", True, "Оборот «забытую кем-то на скамейке» стоит после слова «книгу»."),
+    ("Ученики, выполнившие задание, могут идти домой", True, "Оборот «выполнившие задание» стоит после слова «ученики»."),
+    # Оборот при личном местоимении
+    ("Он, уставший после работы, сразу лёг спать", True, "Оборот относится к личному местоимению «он» - выделяется всегда."),
+    ("Взволнованная предстоящей встречей, она не могла уснуть", True, "Оборот относится к личному местоимению «она» - выделяется даже перед ним."),
+
+    # ========== ЗАПЯТЫЕ НЕ НУЖНЫ (False) ==========
+    # Оборот перед определяемым словом
+    ("Ведущая к дому дорога заросла травой", False, "Оборот «ведущая к дому» стоит перед словом «дорога»."),
+    ("Полученное вчера письмо лежало на столе", False, "Оборот «полученное вчера» стоит перед словом «письмо»."),
+    ("Читающий книгу мальчик не заметил нас", False, "Оборот «читающий книгу» стоит перед словом «мальчик»."),
+    ("Опавшие за ночь листья покрыли дорожку", False, "Оборот «опавшие за ночь» стоит перед словом «листья»."),
+    ("Выполнившие задание ученики могут идти домой", False, "Оборот «выполнившие задание» стоит перед словом «ученики»."),
+    ("Построенный ещё дедом дом стоял на берегу", False, "Оборот «построенный ещё дедом» стоит перед словом «дом»."),
+    ("Покрытая тонким льдом река блестела на солнце", False, "Оборот «покрытая тонким льдом» стоит перед словом «река»."),
+    # Одиночные причастия
+    ("На столе лежала раскрытая книга", False, "Одиночное причастие «раскрытая» стоит перед словом «книга»."),
+    ("Мы долго смотрели на падающий снег", False, "Одиночное причастие «падающий» стоит перед словом «снег»."),
+]
@@ -0,0 +1,34 @@
+# Файл: rules_introductory.py
+# Этот файл содержит правило о запятых при вводных словах
+
+RULE_TEXT = """
+📚 **ПРАВИЛО: Запятые при вводных словах**
+
+Вводные слова выражают отношение говорящего к сказанному и не являются членами предложения.
+Их можно убрать - смысл предложения сохранится.
+
+**Вводные слова выделяются запятыми:**
+
+1.  **Уверенность или предположение:**
+    *конечно, безусловно, кажется, наверное, по-видимому*
+    `Пример: Он, кажется, уже ушёл.`
+
+2.  **Чувства и оценка:**
+    *к счастью, к сожалению, к удивлению*
+    `Пример: К счастью, дождь скоро закончился.`
+
+3.  **Порядок мыслей и источник:**
+    *во-первых, итак, словом, по-моему, по мнению врачей*
+    `Пример: Во-первых, нужно выучить правило.`
+
+**НЕ являются вводными и НЕ выделяются:**
+- *вдруг, едва, почти, всё-таки, будто бы, именно, однако (в значении «но»), зато*
+    `Пример: Я всё-таки решил пойти.`
+- Слова, которые работают членом предложения.
+    `Пример: Тебе верно сказали.` («верно» = «правильно»)
+
+**Краткий чек-лист:**
+1.  Найди слово, похожее на вводное.
+2.  Убери его: предложение не развалилось - слово вводное, запятые нужны.
+3.  Если без него смысл меняется или слово отвечает на вопрос - запятые не нужны.
+"""
@@ -0,0 +1,31 @@
+# Файл: rules_participial.py
+# Этот файл содержит правило о запятых при причастном обороте
+
+RULE_TEXT = """
+📚 **ПРАВИЛО: Запятые при причастном обороте**
+
+Причастный оборот - это причастие с зависимыми словами.
+`Пример: ведущая к дому, полученное вчера, покрытой льдом`
+
+**Когда запятые ставятся:**
+
+1.  **Оборот стоит ПОСЛЕ определяемого слова:**
+    *Оборот выделяется запятыми с обеих сторон.*
+    `Пример: Дорога, ведущая к дому, заросла травой.`
+
+2.  **Оборот относится к личному местоимению:**
+    *Оборот выделяется запятыми, где бы он ни стоял.*
+    `Пример: Взволнованная встречей, она не могла уснуть.`
+
+**Когда запятые НЕ ставятся:**
+- Если оборот стоит ПЕРЕД определяемым словом.
+    `Пример: Ведущая к дому дорога заросла травой.`
+- Если причастие одиночное и стоит перед словом.
+    `Пример: На столе лежала раскрытая книга.`
+
+**Краткий чек-лист:**
+1.  Найди причастие и слова, которые от него зависят.
+2.  Найди слово, к которому относится оборот (какой? - дорога какая?).
+3.  Оборот после этого слова или при местоимении - запятые нужны.
+4.  Оборот перед существительным - запятые не нужны.
+"""
@@ -0,0 +1,50 @@
+# snapshot.py - снимок статистики для веб-сервера
+# Процесс бота периодически публикует маленький JSON, а воркеры gunicorn
+# только читают его и не загружают данные пользователей.
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATS_SNAPSHOT_FILE = os.getenv('STATS_SNAPSHOT_FILE', 'stats_snapshot.json')
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', 15))
+
+
+def publish(data, path=STATS_SNAPSHOT_FILE):
+    """Атомарно записывает снимок: читатели видят либо старый, либо новый файл"""
+    data = dict(data, published_at=time.time(), pid=os.getpid())
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+class SnapshotReader:
+    """Читает снимок заново, только если файл был подменён"""
+
+    def __init__(self, path=STATS_SNAPSHOT_FILE):
+        self.path = path
+        self._stamp = None
+        self._data = None
+
+    def read(self):
+        """Последний снимок или None, если бот ещё ничего не опубликовал"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+                self._stamp = stamp
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                logger.warning(f"⚠️ Не удалось прочитать снимок статистики: {e}")
+        return self._data
+
+    def age(self, data):
+        return time.time() - data["published_at"] if data else None
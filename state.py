@@ -0,0 +1,192 @@
+# state.py - изменения состояния пользователей
+# Все чтения и записи user_data, которые делают обработчики бота. Каждое
+# изменение целиком выполняется под одной блокировкой, await внутри нет -
+# так их можно вызывать и из event loop, и из обычных потоков (stress.py).
+# Ленивая загрузка тем всегда идёт вне блокировки.
+import random
+import threading
+from datetime import datetime
+
+import tracing
+from storage import UserStore
+from topics import DEFAULT_TOPIC, get_topic, get_progress, new_progress
+
+
+def load_user_data():
+    return UserStore()
+
+
+@tracing.traced("save_user_data")
+def save_user_data(data, user_id=None):
+    """Сохраняет одного пользователя или, без user_id, весь горячий набор"""
+    if user_id is None:
+        data.flush()
+    else:
+        data.save(user_id)
+
+
+class UserState:
+    def __init__(self, store, lock=None):
+        self.store = store
+        self.lock = lock or threading.Lock()
+
+    def _known(self, user_id):
+        """Проверка пользователя в начале операции: ровно одно обращение к кэшу"""
+        return self.store.touch(user_id)
+
+    def _topic(self, user_id):
+        return get_topic(self.store[user_id].get("topic"))
+
+    def ensure_user(self, user_id, user_name):
+        """Создаёт запись пользователя при первом /start, возвращает его тему"""
+        with self.lock:
+            if not self._known(user_id):
+                self.store[user_id] = {
+                    "user_name": user_name,
+                    "topic": DEFAULT_TOPIC,
+                    "topics": {DEFAULT_TOPIC: new_progress()},
+                    "last_active": datetime.now().isoformat()
+                }
+                save_user_data(self.store, user_id)
+            return self._topic(user_id)
+
+    def current_topic(self, user_id):
+        """Тема пользователя или None, если пользователь неизвестен"""
+        with self.lock:
+            return self._topic(user_id) if self._known(user_id) else None
+
+    def select_topic(self, user_id, topic_key):
+        with self.lock:
+            if not self._known(user_id):
+                return False
+            record = self.store[user_id]
+            record["topic"] = topic_key
+            record.pop("current_example", None)
+            record.pop("current_topic", None)
+            get_progress(record, topic_key)
+            save_user_data(self.store, user_id)
+            return True
+
+    def stats(self, user_id):
+        """(имя, тема, копия прогресса по теме) или None"""
+        with self.lock:
+            if not self._known(user_id):
+                return None
+            record = self.store[user_id]
+            topic = self._topic(user_id)
+            return record["user_name"], topic, dict(get_progress(record, topic.key))
+
+    def mistakes(self, user_id):
+        """(тема, копия списка ошибок); для неизвестного пользователя ошибок нет"""
+        with self.lock:
+            if not self._known(user_id):
+                return get_topic(DEFAULT_TOPIC), []
+            topic = self._topic(user_id)
+            return topic, get_progress(self.store[user_id], topic.key)["mistakes"].copy()
+
+    def clear_mistakes(self, user_id):
+        with self.lock:
+            if not self._known(user_id):
+                return False
+            topic = self._topic(user_id)
+            get_progress(self.store[user_id], topic.key)["mistakes"] = []
+            save_user_data(self.store, user_id)
+            return True
+
+    def start_question(self, user_id):
+        """Выдаёт пользователю случайный пример текущей темы: (тема, индекс) или None.
+
+        None - если пользователь неизвестен или в теме нет примеров
+        (модуль примеров не загрузился).
+        """
+        topic = self.current_topic(user_id)
+        if topic is None:
+            return None
+
+        # Загрузка примеров темы при первом обращении - вне блокировки
+        if not topic.examples:
+            return None
+        example_index = random.randrange(len(topic.examples))
+
+        with self.lock:
+            if user_id not in self.store:
+                return None
+            record = self.store[user_id]
+            record["current_example"] = example_index
+            record["current_topic"] = topic.key
+            save_user_data(self.store, user_id)
+        return topic, example_index
+
+    def answer(self, user_id, user_answer):
+        """Засчитывает ответ на текущий вопрос.
+
+        Вопрос снимается и счётчики обновляются под одной блокировкой: иначе
+        два быстрых ответа могли засчитать один вопрос дважды. Возвращает
+        None, если вопроса нет, иначе словарь с результатом.
+        """
+        # После перезапуска сохранённый вопрос может оказаться первым обращением
+        # к теме - загружаем её примеры заранее, вне блокировки
+        with self.lock:
+            if not self._known(user_id):
+                return None
+            topic_key = self.store[user_id].get("current_topic", DEFAULT_TOPIC)
+        get_topic(topic_key).examples
+
+        with self.lock:
+            if user_id not in self.store or "current_example" not in self.store[user_id]:
+                return None
+
+            record = self.store[user_id]
+            example_index = record.pop("current_example")
+            # Тему могли сменить между блокировками, но start_question всегда
+            # загружает примеры до того, как записать current_topic
+            topic = get_topic(record.pop("current_topic", DEFAULT_TOPIC))
+            if example_index >= len(topic.examples):
+                # Примеры темы не загрузились после перезапуска - вопрос просто снимаем
+                save_user_data(self.store, user_id)
+                return None
+            _, correct_answer, explanation = topic.examples[example_index]
+
+            progress = get_progress(record, topic.key)
+            progress["total_tests"] += 1
+            is_correct = (user_answer == correct_answer)
+
+            if is_correct:
+                progress["correct_answers"] += 1
+            else:
+                progress["incorrect_answers"] += 1
+                if example_index not in progress["mistakes"]:
+                    progress["mistakes"].append(example_index)
+
+            total = progress["total_tests"]
+            correct = progress["correct_answers"]
+            progress["accuracy"] = (correct / total * 100) if total > 0 else 0
+            record["last_active"] = datetime.now().isoformat()
+            save_user_data(self.store, user_id)
+
+            return {
+                "topic": topic,
+                "example_index": example_index,
+                "is_correct": is_correct,
+                "correct_answer": correct_answer,
+                "explanation": explanation,
+                "correct": correct,
+                "total": total,
+                "accuracy": progress["accuracy"]
+            }
+
+    def cancel_question(self, user_id):
+        with self.lock:
+            if self._known(user_id) and "current_example" in self.store[user_id]:
+                record = self.store[user_id]
+                del record["current_example"]
+                record.pop("current_topic", None)
+                save_user_data(self.store, user_id)
+
+    def user_count(self):
+        with self.lock:
+            return len(self.store)
+
+    def flush(self):
+        with self.lock:
+            save_user_data(self.store)
@@ -0,0 +1,154 @@
+# storage.py - хранилище данных пользователей
+# Активные пользователи держатся в памяти (LRU), остальные лежат на диске
+# по одному файлу на пользователя и подгружаются при следующем сообщении.
+import os
+import json
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+USER_DATA_DIR = os.getenv('USER_DATA_DIR', 'user_data')
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 500))
+LEGACY_USER_DATA_FILE = 'user_data.json'
+
+
+class UserStore:
+    """Словарь пользователей с ограниченным горячим набором в памяти.
+
+    Не потокобезопасен сам по себе - все обращения идут под user_data_lock.
+    """
+
+    def __init__(self, directory=USER_DATA_DIR, capacity=USER_CACHE_SIZE,
+                 legacy_file=LEGACY_USER_DATA_FILE):
+        self.directory = directory
+        self.capacity = max(1, capacity)
+        self._hot = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        # Храним только id всех пользователей, сами данные - на диске
+        self._known = {
+            name[:-5] for name in os.listdir(directory) if name.endswith('.json')
+        }
+
+        if legacy_file and os.path.exists(legacy_file):
+            self._migrate(legacy_file)
+
+    def _path(self, user_id):
+        return os.path.join(self.directory, f"{user_id}.json")
+
+    def _write(self, user_id, record):
+        # Пишем во временный файл и подменяем атомарно, чтобы падение
+        # посреди записи не оставило битый JSON. Временный файл у каждого
+        # процесса свой: старые данные могут переносить два процесса сразу
+        path = self._path(user_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def _read(self, user_id):
+        with open(self._path(user_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _migrate(self, legacy_file):
+        """Переносит старый общий user_data.json в файлы по пользователям"""
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except FileNotFoundError:
+            # Другой процесс уже перенёс данные
+            return
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Не удалось прочитать {legacy_file}: {e}")
+            return
+
+        migrated = {}
+        for user_id, record in legacy.items():
+            if user_id not in self._known:
+                self._write(user_id, record)
+                self._known.add(user_id)
+                migrated[user_id] = record
+
+        # Прогреваем кэш самыми недавно активными из перенесённых сейчас:
+        # у остальных на диске уже свой файл, и он новее старой записи
+        recent = sorted(migrated.items(), key=lambda item: item[1].get('last_active', ''))
+        for user_id, record in recent[-self.capacity:]:
+            self._hot[user_id] = record
+
+        try:
+            os.replace(legacy_file, legacy_file + '.migrated')
+        except FileNotFoundError:
+            return
+        logger.info(f"✅ {len(migrated)} пользователей перенесено из {legacy_file} в {self.directory}/")
+
+    def _evict(self):
+        while len(self._hot) > self.capacity:
+            user_id, record = self._hot.popitem(last=False)
+            self._write(user_id, record)
+            self.evictions += 1
+
+    def __contains__(self, user_id):
+        return user_id in self._hot or user_id in self._known
+
+    def __len__(self):
+        return len(self._known)
+
+    def touch(self, user_id):
+        """Отмечает обращение пользователя (одно на операцию) и считает попадания в кэш.
+
+        Промах сразу подгружает пользователя с диска. Возвращает False,
+        если такого пользователя нет.
+        """
+        if user_id in self._hot:
+            self._hot.move_to_end(user_id)
+            self.hits += 1
+            return True
+        if user_id not in self._known:
+            return False
+        self.misses += 1
+        self[user_id]
+        return True
+
+    def __getitem__(self, user_id):
+        if user_id in self._hot:
+            self._hot.move_to_end(user_id)
+            return self._hot[user_id]
+
+        if user_id not in self._known:
+            raise KeyError(user_id)
+
+        record = self._read(user_id)
+        self._hot[user_id] = record
+        self._evict()
+        return record
+
+    def __setitem__(self, user_id, record):
+        self._hot[user_id] = record
+        self._hot.move_to_end(user_id)
+        self._known.add(user_id)
+        self._evict()
+
+    def save(self, user_id):
+        """Сохраняет на диск одного пользователя из горячего набора"""
+        if user_id in self._hot:
+            self._write(user_id, self._hot[user_id])
+
+    def flush(self):
+        """Сохраняет на диск весь горячий набор"""
+        for user_id, record in self._hot.items():
+            self._write(user_id, record)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "cached": len(self._hot),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
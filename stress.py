@@ -0,0 +1,342 @@
+# stress.py - нагрузочная проверка состояния пользователей
+# Гоняет тысячи перемешанных операций UserState из многих потоков и asyncio-задач,
+# проверяет инварианты и меряет ожидание блокировки. Если установлен aiogram,
+# апдейты идут через FloodControlMiddleware, как в боте.
+#
+# Запуск: python stress.py [--users 10] [--threads 4] [--tasks 8] [--ops 800] [--cache 8] [--debounce 0.01]
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+
+from storage import UserStore
+from state import UserState
+from topics import TOPICS
+
+# FloodControlMiddleware нужен aiogram; без него гоняем обработчики напрямую
+try:
+    from throttling import FloodControlMiddleware
+except ImportError:
+    FloodControlMiddleware = None
+
+
+class TimedLock:
+    """threading.Lock, который считает захваты и время ожидания"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def __enter__(self):
+        if self._lock.acquire(blocking=False):
+            wait = 0.0
+        else:
+            t0 = time.perf_counter()
+            self._lock.acquire()
+            wait = time.perf_counter() - t0
+            self.contended += 1
+        # Счётчики меняются уже под блокировкой
+        self.acquisitions += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        return False
+
+
+def make_state(directory, cache_size):
+    store = UserStore(directory=directory, capacity=cache_size, legacy_file=None)
+    return UserState(store, TimedLock())
+
+
+class Tally:
+    """Сколько ответов реально засчитано по (пользователь, тема)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.answers = Counter()
+        self.correct = Counter()
+
+    def add(self, user_id, result):
+        key = (user_id, result["topic"].key)
+        with self._lock:
+            self.answers[key] += 1
+            if result["is_correct"]:
+                self.correct[key] += 1
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = int(user_id)
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+
+
+# Обработчики-заглушки повторяют форму настоящих: чтение состояния, await
+# (как message.answer в боте), затем изменение - задачи одного потока
+# перемешиваются именно в этих точках
+async def on_start_test(state, tally, user_id):
+    state.stats(user_id)
+    await asyncio.sleep(0)
+    state.start_question(user_id)
+    await asyncio.sleep(0)
+
+
+async def on_answer(state, tally, user_id):
+    state.current_topic(user_id)
+    await asyncio.sleep(0)
+    result = state.answer(user_id, random.random() < 0.5)
+    if result is not None:
+        tally.add(user_id, result)
+    await asyncio.sleep(0)
+
+
+async def on_select_topic(state, tally, user_id):
+    state.current_topic(user_id)
+    await asyncio.sleep(0)
+    state.select_topic(user_id, random.choice(list(TOPICS)))
+
+
+async def on_clear_mistakes(state, tally, user_id):
+    state.mistakes(user_id)
+    await asyncio.sleep(0)
+    state.clear_mistakes(user_id)
+
+
+async def on_menu(state, tally, user_id):
+    state.cancel_question(user_id)
+    await asyncio.sleep(0)
+
+
+async def on_stats(state, tally, user_id):
+    state.stats(user_id)
+    await asyncio.sleep(0)
+    state.mistakes(user_id)
+
+
+# (текст кнопки, обработчик, вес)
+ACTIONS = [
+    ("🚀 Начать тест", on_start_test, 30),
+    ("✅ Да, нужна", on_answer, 35),
+    ("📚 Темы", on_select_topic, 7),
+    ("🧹 Очистить историю ошибок", on_clear_mistakes, 5),
+    ("🔙 В меню", on_menu, 5),
+    ("📊 Статистика", on_stats, 18),
+]
+
+
+def worker_thread(state, tally, users, tasks, ops, errors, middlewares, debounce):
+    # У каждого потока свой event loop, поэтому и своя FloodControlMiddleware
+    flood_control = (
+        FloodControlMiddleware(max_concurrent=4, debounce=debounce)
+        if FloodControlMiddleware else None
+    )
+    texts, handlers, weights = zip(*ACTIONS)
+
+    async def task():
+        for _ in range(ops):
+            user_id = random.choice(users)
+            i = random.choices(range(len(ACTIONS)), weights)[0]
+            try:
+                if flood_control is None:
+                    await handlers[i](state, tally, user_id)
+                else:
+                    async def handler(event, data, handle=handlers[i]):
+                        await handle(state, tally, user_id)
+                    await flood_control(handler, FakeMessage(texts[i]), {"event_from_user": FakeUser(user_id)})
+            except Exception as e:
+                errors.append(repr(e))
+
+    async def main():
+        await asyncio.gather(*(task() for _ in range(tasks)))
+
+    asyncio.run(main())
+    if flood_control is not None:
+        middlewares.append(flood_control)
+
+
+def reader_thread(state, stop, errors):
+    """Имитирует Flask: читает число пользователей и статистику кэша"""
+    while not stop.is_set():
+        try:
+            state.user_count()
+            with state.lock:
+                state.store.stats()
+        except Exception as e:
+            errors.append(repr(e))
+        time.sleep(0.001)
+
+
+def check_invariants(store, users, tally=None):
+    problems = []
+    for user_id in users:
+        record = store[user_id]
+        for topic_key, progress in record.get("topics", {}).items():
+            total = progress["total_tests"]
+            correct = progress["correct_answers"]
+            incorrect = progress["incorrect_answers"]
+            if total != correct + incorrect:
+                problems.append(f"{user_id}/{topic_key}: {total} != {correct} + {incorrect}")
+            if tally is not None:
+                key = (user_id, topic_key)
+                if total != tally.answers[key] or correct != tally.correct[key]:
+                    problems.append(
+                        f"{user_id}/{topic_key}: потеряны обновления "
+                        f"(в записи {total}/{correct}, засчитано {tally.answers[key]}/{tally.correct[key]})"
+                    )
+    return problems
+
+
+def stress(args, directory):
+    state = make_state(directory, args.cache)
+    tally = Tally()
+    errors = []
+    middlewares = []
+    users = [str(100000 + i) for i in range(args.users)]
+
+    for user_id in users:
+        state.ensure_user(user_id, f"user{user_id}")
+
+    stop = threading.Event()
+    reader = threading.Thread(target=reader_thread, args=(state, stop, errors))
+    reader.start()
+
+    threads = [
+        threading.Thread(target=worker_thread, args=(state, tally, users, args.tasks, args.ops, errors,
+                                                     middlewares, args.debounce))
+        for _ in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    reader.join()
+
+    total_ops = args.threads * args.tasks * args.ops
+    lock = state.lock
+    print(f"Операций: {total_ops} за {elapsed:.2f} сек ({total_ops / elapsed:.0f} оп/сек)")
+    print(f"Засчитано ответов: {sum(tally.answers.values())}")
+    print(f"Блокировка: {lock.acquisitions} захватов, {lock.contended} с ожиданием, "
+          f"среднее ожидание {lock.total_wait / max(lock.acquisitions, 1) * 1e6:.1f} мкс, "
+          f"максимум {lock.max_wait * 1e3:.2f} мс")
+    print(f"Кэш: {state.store.stats()}")
+    if FloodControlMiddleware is None:
+        print("⚠️  aiogram не установлен: FloodControlMiddleware не проверяется")
+    else:
+        print(f"Отброшено повторов: {sum(m.dropped for m in middlewares)}")
+
+    problems = [f"исключение: {e}" for e in errors[:10]]
+    for flood_control in middlewares:
+        if flood_control.stats()["in_flight_users"]:
+            problems.append(f"в middleware остались незавершённые апдейты: {flood_control.stats()}")
+    problems += check_invariants(state.store, users, tally)
+
+    # Всё, что сохранено, должно читаться заново с диска
+    state.flush()
+    reloaded = UserStore(directory=directory, capacity=args.cache, legacy_file=None)
+    if len(reloaded) != len(users):
+        problems.append(f"после перезагрузки {len(reloaded)} пользователей вместо {len(users)}")
+    problems += check_invariants(reloaded, users, tally)
+    return problems
+
+
+def crash_writer(directory):
+    """Дочерний процесс для проверки падения: пишет без остановки, пока не убьют"""
+    state = make_state(directory, 4)
+    users = [str(200000 + i) for i in range(16)]
+    for user_id in users:
+        state.ensure_user(user_id, f"user{user_id}")
+    ready = False
+    while True:
+        user_id = random.choice(users)
+        state.start_question(user_id)
+        state.answer(user_id, random.random() < 0.5)
+        if not ready:
+            # Родитель начинает отсчёт только отсюда: один импорт aiogram идёт секунды
+            print("ready", flush=True)
+            ready = True
+
+
+def crash_test(directory, seconds=1.0):
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--crash-writer', directory],
+                             stdout=subprocess.PIPE, text=True)
+    try:
+        ready = child.stdout.readline().strip() == "ready"
+        if ready:
+            time.sleep(seconds)
+    finally:
+        child.kill()  # SIGKILL: без finally и без сохранения
+        child.wait()
+        child.stdout.close()
+
+    problems = []
+    if not ready:
+        problems.append(f"дочерний процесс завершился до начала записи (код {child.returncode})")
+    files = [name for name in os.listdir(directory) if name.endswith('.json')]
+    for name in files:
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                json.load(f)
+        except json.JSONDecodeError as e:
+            problems.append(f"{name}: битый JSON после kill -9 ({e})")
+
+    if not files:
+        problems.append("дочерний процесс не успел ничего записать")
+    else:
+        store = UserStore(directory=directory, capacity=4, legacy_file=None)
+        problems += check_invariants(store, [name[:-5] for name in files])
+    print(f"Crash-тест: {len(files)} файлов проверено")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочная проверка состояния пользователей")
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--tasks', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=800, help="апдейтов на задачу; всего threads * tasks * ops")
+    parser.add_argument('--cache', type=int, default=8, help="размер горячего набора UserStore")
+    parser.add_argument('--debounce', type=float, default=0.01, help="окно повторов FloodControlMiddleware, сек")
+    parser.add_argument('--crash-writer', metavar='DIR', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.crash_writer:
+        crash_writer(args.crash_writer)
+        return
+
+    print("=" * 60)
+    print("НАГРУЗОЧНАЯ ПРОВЕРКА СОСТОЯНИЯ ПОЛЬЗОВАТЕЛЕЙ")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory(prefix='stress-') as directory:
+        problems = stress(args, directory)
+    with tempfile.TemporaryDirectory(prefix='crash-') as directory:
+        problems += crash_test(directory)
+    print("=" * 60)
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Все инварианты выполнены")
+
+
+if __name__ == "__main__":
+    main()
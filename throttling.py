@@ -0,0 +1,125 @@
+# throttling.py - защита от потока апдейтов
+# Ограничивает число одновременно обрабатываемых апдейтов, выполняет апдейты
+# одного пользователя строго по очереди и отбрасывает повторные нажатия.
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from aiogram import BaseMiddleware
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', 32))
+DEBOUNCE_SECONDS = float(os.getenv('DEBOUNCE_SECONDS', 1.0))
+MAX_PENDING_PER_USER = int(os.getenv('MAX_PENDING_PER_USER', 3))
+
+
+class _Slot:
+    """Общий слот одного апдейта. Отпускается, только если реально занят:
+    отмена обработчика внутри idle() не должна увеличивать общий лимит"""
+
+    def __init__(self, semaphore):
+        self.semaphore = semaphore
+        self.held = False
+
+    async def acquire(self):
+        await self.semaphore.acquire()
+        self.held = True
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.semaphore.release()
+
+    @asynccontextmanager
+    async def idle(self):
+        """Отдаёт общий слот на время блока"""
+        self.release()
+        try:
+            yield
+        finally:
+            await self.acquire()
+
+
+class FloodControlMiddleware(BaseMiddleware):
+    """Outer-middleware для сообщений: debounce, очередь на пользователя, общий лимит.
+
+    Обработчик может принять аргумент flood_idle и обернуть в него ожидание
+    без работы (asyncio.sleep и т.п.): на это время общий слот освобождается,
+    а очередь пользователя остаётся занятой, чтобы сохранить порядок ответов.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_UPDATES,
+                 debounce=DEBOUNCE_SECONDS, max_pending=MAX_PENDING_PER_USER):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.debounce = debounce
+        self.max_pending = max_pending
+        self._user_locks = {}
+        self._pending = {}
+        self._last_seen = {}
+        self.dropped = 0
+
+    async def __call__(self, handler, event, data):
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        user_id = user.id
+        now = time.monotonic()
+
+        # Повторное нажатие той же кнопки в пределах окна - просто игнорируем
+        last = self._last_seen.get(user_id)
+        if last and last[0] == event.text and now - last[1] < self.debounce:
+            self.dropped += 1
+            logger.info(f"Повторное сообщение от {user_id} отброшено: {event.text!r}")
+            return None
+
+        # Пользователь накидал слишком много апдейтов - лишние отбрасываем
+        pending = self._pending.get(user_id, 0)
+        if pending >= self.max_pending:
+            self.dropped += 1
+            logger.warning(f"Очередь пользователя {user_id} переполнена, апдейт отброшен")
+            return None
+
+        self._last_seen[user_id] = (event.text, now)
+        self._pending[user_id] = pending + 1
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+        try:
+            with tracing.span("queue_wait"):
+                await lock.acquire()
+            try:
+                slot = _Slot(self.semaphore)
+                with tracing.span("slot_wait"):
+                    await slot.acquire()
+                try:
+                    data["flood_idle"] = slot.idle
+                    tracing.restart_routing(data)
+                    return await handler(event, data)
+                finally:
+                    slot.release()
+            finally:
+                lock.release()
+        finally:
+            self._pending[user_id] -= 1
+            if not self._pending[user_id]:
+                # Последний апдейт пользователя - не держим его состояние в памяти
+                del self._pending[user_id]
+                del self._user_locks[user_id]
+            if len(self._last_seen) > 1024:
+                self._prune(time.monotonic())
+
+    def _prune(self, now):
+        self._last_seen = {
+            user_id: last for user_id, last in self._last_seen.items()
+            if now - last[1] < self.debounce or user_id in self._pending
+        }
+
+    def stats(self):
+        return {
+            "in_flight_users": len(self._pending),
+            "dropped": self.dropped
+        }
@@ -0,0 +1,155 @@
+# topics.py - темы тренажёра
+# Правило и примеры темы импортируются при первом обращении и дальше
+# общие для всех пользователей, поэтому старт бота не зависит от числа тем.
+import importlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _comma_before_i(sentence, needs_comma):
+    """Ставит запятую перед последним «и» (примеры записаны без неё)"""
+    if needs_comma:
+        parts = sentence.rsplit(" и ", 1)
+        return parts[0] + ", и " + parts[1] if len(parts) == 2 else sentence
+    return sentence
+
+
+class Topic:
+    def __init__(self, key, title, rules_module, examples_module, question,
+                 answers=("✅ Да, нужна", "❌ Нет, не нужна"),
+                 punctuated=False, correct_sentence=_comma_before_i):
+        self.key = key
+        self.title = title
+        self.question = question
+        # Подписи кнопок (да, нет) - согласованы с вопросом темы
+        self.answers = answers
+        self._rules_module = rules_module
+        self._examples_module = examples_module
+        # punctuated=True: примеры записаны с правильными запятыми,
+        # а в вопросе показываются без них. Убираются ВСЕ запятые, поэтому
+        # в таких корпусах не должно быть запятых, не относящихся к теме
+        self._punctuated = punctuated
+        self._correct_sentence = correct_sentence
+        self._rule_text = None
+        self._examples = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._examples is not None:
+                return
+            # Сломанная тема не должна ронять бота: без примеров тест по ней
+            # не начинается (UserState.start_question), без правила - заглушка
+            try:
+                examples = importlib.import_module(self._examples_module).EXAMPLES
+                logger.info(f"✅ Тема «{self.title}»: загружено {len(examples)} примеров")
+            except ImportError as e:
+                logger.error(f"❌ Не удалось загрузить {self._examples_module}.py: {e}")
+                examples = []
+            try:
+                rule_text = importlib.import_module(self._rules_module).RULE_TEXT
+            except ImportError as e:
+                logger.error(f"❌ Не удалось загрузить {self._rules_module}.py: {e}")
+                rule_text = f"⚠️ Правило темы «{self.title}» сейчас недоступно."
+            self._rule_text = rule_text
+            self._examples = examples
+
+    @property
+    def loaded(self):
+        return self._examples is not None
+
+    @property
+    def rule_text(self):
+        if self._examples is None:
+            self._load()
+        return self._rule_text
+
+    @property
+    def examples(self):
+        if self._examples is None:
+            self._load()
+        return self._examples
+
+    def answer_label(self, answer):
+        return self.answers[0] if answer else self.answers[1]
+
+    def question_sentence(self, example_index):
+        sentence = self.examples[example_index][0]
+        return sentence.replace(",", "") if self._punctuated else sentence
+
+    def correct_sentence(self, example_index):
+        sentence, needs_comma, _ = self.examples[example_index]
+        if self._punctuated:
+            return sentence
+        return self._correct_sentence(sentence, needs_comma)
+
+
+TOPICS = {
+    "comma_i": Topic(
+        "comma_i", "Запятая перед «и»", "rules", "examples",
+        "Нужна ли запятой перед союзом *«и»* в этом предложении?"
+    ),
+    "participial": Topic(
+        "participial", "Причастный оборот", "rules_participial", "examples_participial",
+        "Нужно ли выделять запятыми *причастный оборот* в этом предложении?",
+        answers=("✅ Да, нужно", "❌ Нет, не нужно"),
+        punctuated=True
+    ),
+    "introductory": Topic(
+        "introductory", "Вводные слова", "rules_introductory", "examples_introductory",
+        "Нужны ли в этом предложении запятые при *вводном слове*?",
+        answers=("✅ Да, нужны", "❌ Нет, не нужны"),
+        punctuated=True
+    ),
+}
+DEFAULT_TOPIC = "comma_i"
+
+# Поля прогресса, которые раньше хранились прямо в записи пользователя
+PROGRESS_FIELDS = ("total_tests", "correct_answers", "incorrect_answers", "accuracy", "mistakes")
+
+
+def get_topic(key):
+    return TOPICS.get(key) or TOPICS[DEFAULT_TOPIC]
+
+
+def find_by_title(title):
+    for topic in TOPICS.values():
+        if topic.title == title:
+            return topic
+    return None
+
+
+def parse_answer(text):
+    """True/False для кнопки ответа любой темы, None - если это не ответ"""
+    for topic in TOPICS.values():
+        if text == topic.answers[0]:
+            return True
+        if text == topic.answers[1]:
+            return False
+    return None
+
+
+def new_progress():
+    return {
+        "total_tests": 0,
+        "correct_answers": 0,
+        "incorrect_answers": 0,
+        "accuracy": 0.0,
+        "mistakes": []
+    }
+
+
+def get_progress(record, topic_key):
+    """Прогресс пользователя по теме; старые записи переносятся в тему по умолчанию"""
+    progress = record.setdefault("topics", {})
+    if "total_tests" in record:
+        legacy = new_progress()
+        for field in PROGRESS_FIELDS:
+            if field in record:
+                legacy[field] = record.pop(field)
+        progress[DEFAULT_TOPIC] = legacy
+    if topic_key not in progress:
+        progress[topic_key] = new_progress()
+    return progress[topic_key]
@@ -0,0 +1,271 @@
+# tracing.py - трассировка обработки апдейтов и профилирование
+# Включается переменной окружения TRACE_DIR. Без неё все функции - пустышки.
+import os
+import json
+import time
+import threading
+import logging
+import contextvars
+import cProfile
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+TRACE_DIR = os.getenv('TRACE_DIR')
+TRACE_FORMAT = os.getenv('TRACE_FORMAT', 'chrome')  # chrome | jsonl
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+ADMIN_IDS = {i.strip() for i in os.getenv('ADMIN_IDS', '').split(',') if i.strip()}
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_MAX_SECONDS = 120
+
+# Текущий апдейт: aiogram обрабатывает каждый апдейт в своей задаче,
+# поэтому contextvars не перемешиваются между пользователями
+_current = contextvars.ContextVar('trace_current', default=None)
+
+
+class TraceWriter:
+    """Пишет спаны в файл: Chrome trace (chrome://tracing, Perfetto) или JSONL"""
+
+    def __init__(self, directory, fmt='chrome'):
+        os.makedirs(directory, exist_ok=True)
+        self.fmt = fmt
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        ext = 'json' if fmt == 'chrome' else 'jsonl'
+        self.path = os.path.join(directory, f"trace-{stamp}-{os.getpid()}.{ext}")
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'w', encoding='utf-8')
+        if fmt == 'chrome':
+            # Формат JSON Array допускает отсутствие закрывающей скобки,
+            # так что файл можно читать, даже если процесс был убит
+            self._file.write('[\n')
+        logger.info(f"🔎 Трассировка включена: {self.path}")
+
+    def write(self, name, start, duration, args):
+        if self.fmt == 'chrome':
+            line = json.dumps({
+                "name": name,
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": duration * 1e6,
+                "pid": os.getpid(),
+                "tid": args.get("update_id", 0),
+                "args": args,
+            }, ensure_ascii=False) + ',\n'
+        else:
+            line = json.dumps({
+                "name": name,
+                "start": start,
+                "duration_ms": round(duration * 1000, 3),
+                **args,
+            }, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+
+_writer = TraceWriter(TRACE_DIR, TRACE_FORMAT) if TRACE_DIR else None
+
+
+def enabled():
+    return _writer is not None
+
+
+def _record(name, start, duration, extra=None):
+    current = _current.get()
+    if _writer is None or current is None:
+        return
+    args = dict(current)
+    if extra:
+        args.update(extra)
+    _writer.write(name, start, duration, args)
+
+
+@contextmanager
+def span(name, **extra):
+    """Засекает время блока и пишет спан, если идёт трассировка апдейта"""
+    if _writer is None or _current.get() is None:
+        yield
+        return
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter() - t0, extra)
+
+
+def traced(name):
+    """Декоратор для синхронных функций, например save_user_data"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracedLock:
+    """Обёртка над threading.Lock: пишет ожидание (lock_wait) и удержание (state)"""
+
+    def __init__(self, lock=None):
+        self._lock = lock or threading.Lock()
+        self._held_since = None
+
+    def __enter__(self):
+        if _writer is None or _current.get() is None:
+            self._lock.acquire()
+            self._held_since = None
+            return self
+        start = time.time()
+        t0 = time.perf_counter()
+        self._lock.acquire()
+        acquired = time.perf_counter()
+        _record("lock_wait", start, acquired - t0)
+        self._held_since = (start + (acquired - t0), acquired)
+        return self
+
+    def __exit__(self, *exc):
+        held_since = self._held_since
+        self._held_since = None
+        self._lock.release()
+        if held_since is not None:
+            _record("state", held_since[0], time.perf_counter() - held_since[1])
+        return False
+
+    def acquire(self, *args, **kwargs):
+        return self._lock.acquire(*args, **kwargs)
+
+    def release(self):
+        self._lock.release()
+
+
+# --- MIDDLEWARE ДЛЯ AIOGRAM ---
+def restart_routing(data):
+    """Начинает отсчёт routing заново - после очередей FloodControlMiddleware,
+    чтобы routing мерил только фильтры роутера, а не queue_wait/slot_wait"""
+    if "trace_received_at" in data:
+        data["trace_received_at"] = (time.time(), time.perf_counter())
+
+
+def setup_tracing(dp, bot):
+    """Подключает спаны receive/routing/handler и спаны вызовов Bot API"""
+    if _writer is None:
+        return
+
+    from aiogram import BaseMiddleware
+    from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+    class UpdateTraceMiddleware(BaseMiddleware):
+        async def __call__(self, handler, event, data):
+            user = data.get("event_from_user")
+            token = _current.set({
+                "update_id": event.update_id,
+                "user_id": user.id if user else None,
+            })
+            data["trace_received_at"] = (time.time(), time.perf_counter())
+            try:
+                with span("receive"):
+                    return await handler(event, data)
+            finally:
+                _current.reset(token)
+
+    class HandlerTraceMiddleware(BaseMiddleware):
+        async def __call__(self, handler, event, data):
+            received = data.get("trace_received_at")
+            if received:
+                # Время от получения апдейта до выбора обработчика (фильтры роутера)
+                _record("routing", received[0], time.perf_counter() - received[1])
+            with span("handler", text=getattr(event, "text", None)):
+                return await handler(event, data)
+
+    class RequestTraceMiddleware(BaseRequestMiddleware):
+        async def __call__(self, make_request, bot, method):
+            with span(f"api.{type(method).__name__}"):
+                return await make_request(bot, method)
+
+    dp.update.outer_middleware(UpdateTraceMiddleware())
+    dp.message.middleware(HandlerTraceMiddleware())
+    bot.session.middleware(RequestTraceMiddleware())
+
+
+# --- ПРОФИЛИРОВАНИЕ ---
+class LoopProfiler:
+    """cProfile для потока с event loop бота, запускается по команде или HTTP"""
+
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        self.loop = None
+        self.running = False
+        self.last_path = None
+        # running проверяют и event loop (/profile в Telegram), и поток Flask
+        self._lock = threading.Lock()
+
+    def attach(self, loop):
+        self.loop = loop
+
+    def _claim(self):
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Профилирование уже идёт")
+            self.running = True
+
+    async def capture(self, seconds):
+        """Профилирует event loop seconds секунд, возвращает путь к .prof файлу"""
+        self._claim()
+        return await self._capture(seconds)
+
+    async def _capture(self, seconds):
+        import asyncio
+
+        profiler = cProfile.Profile()
+        try:
+            # cProfile видит только текущий поток - вызываем из потока event loop
+            profiler.enable()
+            await asyncio.sleep(seconds)
+        finally:
+            # И при отмене задачи (остановка бота) профайлер должен выключиться
+            profiler.disable()
+            self.running = False
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f"loop-{stamp}-{os.getpid()}.prof")
+        profiler.dump_stats(path)
+        self.last_path = path
+        logger.info(f"🧪 Профиль сохранён: {path}")
+        return path
+
+    def start_from_thread(self, seconds):
+        """Запуск из другого потока (Flask); не ждёт окончания записи.
+
+        Занятость проверяется здесь же, синхронно, чтобы вызывающий получил
+        RuntimeError, а не ошибку в future, которую никто не прочитает.
+        """
+        import asyncio
+
+        if self.loop is None or not self.loop.is_running():
+            raise RuntimeError("Event loop бота не запущен в этом процессе")
+        self._claim()
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._capture(seconds), self.loop)
+        except BaseException:
+            self.running = False
+            raise
+        future.add_done_callback(self._log_failure)
+
+    def _log_failure(self, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"❌ Профилирование не удалось: {error!r}")
+
+
+profiler = LoopProfiler()
+
+
+def is_admin(user_id):
+    return str(user_id) in ADMIN_IDS
@@ -0,0 +1,87 @@
+# web.py - веб-сервер (gunicorn web:app)
+# Не загружает данные пользователей: всё берёт из снимка, который публикует bot.py,
+# поэтому воркеров gunicorn можно запускать сколько угодно.
+import logging
+from datetime import datetime
+from flask import Flask, jsonify
+
+from snapshot import SnapshotReader, SNAPSHOT_INTERVAL
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+snapshot = SnapshotReader()
+
+
+def bot_status(data):
+    """running / stale (бот давно не обновлял снимок) / unknown (снимка ещё нет)"""
+    if data is None:
+        return "unknown"
+    if snapshot.age(data) > SNAPSHOT_INTERVAL * 3 or not data.get("bot_running"):
+        return "stale"
+    return "running"
+
+
+# --- ВЕБ-ЭНДПОИНТЫ ---
+@app.route('/')
+def home():
+    data = snapshot.read()
+    status = bot_status(data)
+    data = data or {}
+    updated = (datetime.fromtimestamp(data["published_at"]).strftime('%Y-%m-%d %H:%M:%S')
+               if data else "ещё нет данных")
+
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>🤖 Бот для тренировки запятых</title>
+        <meta charset="utf-8">
+        <style>
+            body {{ font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }}
+            .status {{ color: green; font-weight: bold; }}
+            .status-stale {{ color: #c77700; font-weight: bold; }}
+        </style>
+    </head>
+    <body>
+        <h1>🤖 Бот для тренировки запятых</h1>
+        <p>Статус: {'<span class="status">✅ Активен</span>' if status == 'running' else '<span class="status-stale">⚠️ Нет свежих данных от бота</span>'}</p>
+        <p>Время: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+        <p>Тем: {data.get('topics', '—')}</p>
+        <p>Примеров загружено: {data.get('examples', '—')}</p>
+        <p>Пользователей: {data.get('users', '—')}</p>
+        <p>Статистика обновлена: {updated}</p>
+        <hr>
+        <p>🔄 Бот автоматически поддерживает активность каждые 5 минут</p>
+        <p>🌐 Веб-сервер запущен и слушает порт</p>
+        <p>🤖 Telegram бот работает в отдельном процессе</p>
+        <p><a href="/ping">Проверить связь</a> | <a href="/health">Статус</a></p>
+    </body>
+    </html>
+    """
+
+@app.route('/ping')
+def ping():
+    logger.info("Получен ping запрос")
+    return 'pong', 200
+
+@app.route('/health')
+def health():
+    data = snapshot.read()
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "bot_status": bot_status(data),
+        "snapshot_age": round(snapshot.age(data), 1) if data else None,
+        "users": data.get("users") if data else None,
+        "topics": data.get("topics") if data else None,
+        "loaded_topics": data.get("loaded_topics") if data else None,
+        "examples": data.get("examples") if data else None,
+        "user_cache": data.get("user_cache") if data else None,
+        "flood_control": data.get("flood_control") if data else None
+    }), 200